@@ -8,18 +8,459 @@ properly configured and running the sample application.
 """
 
 import argparse
+import asyncio
+import contextvars
+import importlib.metadata
+import importlib.util
+import inspect
 import json
+import math
 import os
+import sqlite3
 import subprocess
 import sys
 import time
 import requests
 import boto3
 import datetime
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import random
+import re
+import socket
+import threading
 import tabulate
 from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from botocore.exceptions import ClientError
 
+# Infracost resource types (prefix match) grouped into the components we size and pay for
+COST_COMPONENTS = {
+    "ECS EC2 capacity": ("aws_autoscaling_group", "aws_launch_template", "aws_launch_configuration", "aws_ecs_"),
+    "ALB": ("aws_lb", "aws_alb"),
+    "ElastiCache": ("aws_elasticache_",),
+    "RDS": ("aws_db_instance", "aws_rds_"),
+    "NAT": ("aws_nat_gateway",),
+}
+
+HOURS_PER_MONTH = 730
+
+# ALB access log entry, see
+# https://docs.aws.amazon.com/elasticloadbalancing/latest/application/load-balancer-access-logs.html
+ALB_LOG_PATTERN = re.compile(
+    r'(?P<type>\S+) (?P<time>\S+) (?P<elb>\S+) (?P<client>\S+) (?P<target>\S+) '
+    r'(?P<request_processing_time>\S+) (?P<target_processing_time>\S+) (?P<response_processing_time>\S+) '
+    r'(?P<elb_status_code>\S+) (?P<target_status_code>\S+) (?P<received_bytes>\S+) (?P<sent_bytes>\S+) '
+    r'"(?P<request>[^"]*)" "(?P<user_agent>(?:[^"\\]|\\.)*)" (?P<ssl_cipher>\S+) (?P<ssl_protocol>\S+) '
+    r'(?P<target_group_arn>\S+) "(?P<trace_id>[^"]*)" "(?P<domain_name>[^"]*)" "(?P<chosen_cert_arn>[^"]*)" '
+    r'(?P<matched_rule_priority>\S+) (?P<request_creation_time>\S+)'
+)
+
+# Interval end time in ALB access log file names, e.g. ..._app.my-alb.abc123_20261019T1005Z_10.0.0.1_x.log.gz
+ALB_LOG_FILE_WINDOW_PATTERN = re.compile(r'_(\d{8}T\d{4}Z)_')
+
+# Path segments collapsed when grouping replay results by endpoint
+ID_SEGMENT_PATTERN = re.compile(r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{16,})$')
+
+
+def _percentile(values, pct):
+    """Return the pct-th percentile of values using linear interpolation."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+class Reservoir:
+    """Fixed-size uniform random sample of a stream of values (reservoir sampling)."""
+
+    def __init__(self, size):
+        self.size = size
+        self.count = 0
+        self.values = []
+
+    def add(self, value):
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < self.size:
+                self.values[index] = value
+
+
+def _regularized_incomplete_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), evaluated with a continued fraction."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+
+    def continued_fraction(a, b, x):
+        tiny = 1e-300
+        c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        result = d
+        for m in range(1, 200):
+            for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                              -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+                d = 1.0 + numerator * d
+                d = 1.0 / (d if abs(d) > tiny else tiny)
+                c = 1.0 + numerator / c
+                c = c if abs(c) > tiny else tiny
+                result *= c * d
+            if abs(c * d - 1.0) < 1e-12:
+                break
+        return result
+
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * continued_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * continued_fraction(b, a, 1 - x) / b
+
+
+def _prediction_p_value(value, baseline):
+    """One-sided p-value that value is larger than a new draw from the baseline's distribution.
+
+    Uses a Student t prediction interval over the per-run baseline values, so it
+    tests the gated metric itself and respects run-to-run variation.
+    """
+    n = len(baseline)
+    mean = sum(baseline) / n
+    sd = math.sqrt(sum((x - mean) ** 2 for x in baseline) / (n - 1))
+    if sd == 0:
+        return 0.0 if value > mean else 1.0
+
+    t = (value - mean) / (sd * math.sqrt(1 + 1 / n))
+    df = n - 1
+    tail = 0.5 * _regularized_incomplete_beta(df / 2, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1 - tail
+
+
+class ResultStore:
+    """SQLite-backed history of runbook runs, used for regression detection."""
+
+    def __init__(self, db_path):
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.db_path = db_path
+        # Checks may record runs from worker threads, so share one connection behind a lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    environment TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    git_commit TEXT,
+                    image_tag TEXT,
+                    passed INTEGER,
+                    metrics TEXT,
+                    samples TEXT
+                )
+            """)
+            self.conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_runs_env_action_time
+                ON runs (environment, action, started_at)
+            """)
+
+    def record_run(self, environment, action, passed, metrics, samples=None, git_commit=None, image_tag=None):
+        """Store a single run and return its id."""
+        started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (environment, action, started_at, git_commit, image_tag, passed, metrics, samples) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (environment, action, started_at, git_commit, image_tag,
+                 None if passed is None else int(bool(passed)),
+                 json.dumps(metrics), json.dumps(samples) if samples is not None else None)
+            )
+        return cursor.lastrowid
+
+    def get_runs(self, environment, action, since=None, limit=None):
+        """Return runs for an environment and action, newest first."""
+        query = "SELECT * FROM runs WHERE environment = ? AND action = ?"
+        params = [environment, action]
+        if since:
+            query += " AND started_at >= ?"
+            params.append(since.isoformat())
+        query += " ORDER BY started_at DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run["metrics"] = json.loads(run["metrics"]) if run["metrics"] else {}
+            run["samples"] = json.loads(run["samples"]) if run["samples"] else []
+            runs.append(run)
+        return runs
+
+
+class CheckRegistry:
+    """Registry of checks that can be run by the `checks` action.
+
+    A check is a callable taking (runbook, results), where results maps the
+    names of its dependencies to their return values. It may be a plain
+    function, which runs in a worker thread, or a coroutine function. A
+    returned list is treated as issues (empty means passed), a bool as the
+    pass/fail flag and anything else as informational data that passes.
+    """
+
+    def __init__(self):
+        self.checks = {}
+
+    def register(self, name, func, depends_on=(), aws_services=(), cost=1, description=None):
+        """Register a check along with its dependencies, AWS services and relative cost."""
+        self.checks[name] = {
+            "name": name,
+            "func": func,
+            "depends_on": list(depends_on),
+            "aws_services": list(aws_services),
+            "cost": cost,
+            "description": description or (func.__doc__ or "").strip().split("\n")[0]
+        }
+
+    def check(self, name, **kwargs):
+        """Decorator form of register()."""
+        def decorator(func):
+            self.register(name, func, **kwargs)
+            return func
+        return decorator
+
+    def load_plugins(self, plugins_dir=None, entry_point_group=None):
+        """Load plugins from a directory of modules and from installed package entry points.
+
+        Each plugin provides a register(registry) function that adds its checks.
+        """
+        register_functions = []
+
+        if plugins_dir and os.path.isdir(plugins_dir):
+            for name in sorted(os.listdir(plugins_dir)):
+                if not name.endswith(".py") or name.startswith("_"):
+                    continue
+                path = os.path.join(plugins_dir, name)
+                spec = importlib.util.spec_from_file_location(f"runbook_checks.{name[:-3]}", path)
+                module = importlib.util.module_from_spec(spec)
+                try:
+                    spec.loader.exec_module(module)
+                except Exception as e:
+                    print(f"Warning: Could not load check plugin {path}: {e}")
+                    continue
+                if hasattr(module, "register"):
+                    register_functions.append((path, module.register))
+
+        if entry_point_group:
+            entry_points = importlib.metadata.entry_points()
+            if hasattr(entry_points, "select"):
+                entry_points = entry_points.select(group=entry_point_group)
+            else:
+                entry_points = entry_points.get(entry_point_group, [])
+            for entry_point in entry_points:
+                try:
+                    register_functions.append((entry_point.name, entry_point.load()))
+                except Exception as e:
+                    print(f"Warning: Could not load check plugin {entry_point.name}: {e}")
+
+        for source, register in register_functions:
+            try:
+                register(self)
+            except Exception as e:
+                print(f"Warning: Check plugin {source} failed to register: {e}")
+
+    def resolve(self, names=None):
+        """Return the requested checks and their dependencies in dependency order.
+
+        Among checks that are ready at the same time, the more expensive ones come
+        first so they start early and do not end up on the critical path.
+        """
+        names = list(names) if names else list(self.checks)
+        required = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.checks:
+                raise ValueError(f"Unknown check: {name}")
+            if name not in required:
+                required.add(name)
+                pending.extend(self.checks[name]["depends_on"])
+
+        ordered = []
+        remaining = set(required)
+        while remaining:
+            ready = [name for name in remaining
+                     if all(dep in ordered for dep in self.checks[name]["depends_on"])]
+            if not ready:
+                raise ValueError(f"Circular check dependencies between: {', '.join(sorted(remaining))}")
+            ready.sort(key=lambda name: (-self.checks[name]["cost"], name))
+            ordered.extend(ready)
+            remaining.difference_update(ready)
+        return ordered
+
+
+class CheckProfiler:
+    """Per-check instrumentation: wall time, AWS API calls, retries, throttles and bytes."""
+
+    THROTTLE_ERROR_CODES = {
+        "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+        "TooManyRequestsException", "RequestLimitExceeded", "SlowDown", "RequestThrottled"
+    }
+
+    def __init__(self):
+        self.current_check = contextvars.ContextVar("current_check", default=None)
+        self.records = {}
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def attach(self, client):
+        """Hook into a boto3 client's events so its API calls are attributed to the running check."""
+        events = client.meta.events
+        events.register("before-call", self._before_call)
+        events.register("before-send", self._before_send)
+        events.register("needs-retry", self._needs_retry)
+        events.register("after-call", self._after_call)
+
+    def _record(self):
+        name = self.current_check.get()
+        return self.records.get(name) if name else None
+
+    def _before_call(self, model, **kwargs):
+        record = self._record()
+        if record is not None:
+            operation = f"{model.service_model.service_name}.{model.name}"
+            with self.lock:
+                record["api_calls"] += 1
+                record["operations"][operation] = record["operations"].get(operation, 0) + 1
+
+    def _before_send(self, request, **kwargs):
+        record = self._record()
+        if record is not None:
+            body = request.body or b""
+            with self.lock:
+                record["attempts"] += 1
+                record["bytes_sent"] += len(body) if isinstance(body, (bytes, str)) else 0
+
+    def _needs_retry(self, response=None, **kwargs):
+        record = self._record()
+        if record is not None and response:
+            error_code = response[1].get("Error", {}).get("Code")
+            if error_code in self.THROTTLE_ERROR_CODES:
+                with self.lock:
+                    record["throttles"] += 1
+        # Returning None leaves the retry decision to botocore's own handler
+
+    def _after_call(self, http_response=None, model=None, **kwargs):
+        record = self._record()
+        if record is not None and http_response is not None:
+            if model is not None and model.has_streaming_output:
+                # Reading .content would drain the body (e.g. S3 get_object) before the check sees it
+                size = int(http_response.headers.get("Content-Length") or 0)
+            else:
+                size = len(http_response.content or b"")
+            with self.lock:
+                record["bytes_received"] += size
+
+    async def profile(self, name, coro_func):
+        """Run coro_func() with its time and API usage attributed to the named check."""
+        record = self.records[name] = {
+            "name": name,
+            "start": time.perf_counter() - self.origin,
+            "wall_time": 0.0,
+            "api_calls": 0,
+            "attempts": 0,
+            "throttles": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "operations": {}
+        }
+        token = self.current_check.set(name)
+        try:
+            return await coro_func()
+        finally:
+            self.current_check.reset(token)
+            record["wall_time"] = time.perf_counter() - self.origin - record["start"]
+
+    def summary(self):
+        """Return the per-check records with retries derived from attempts and calls."""
+        return [dict(record, retries=max(record["attempts"] - record["api_calls"], 0))
+                for record in sorted(self.records.values(), key=lambda record: record["start"])]
+
+    def export(self, path, output_format="json"):
+        """Write the profile as plain JSON or as a Chrome trace (chrome://tracing, Perfetto)."""
+        records = self.summary()
+        if output_format == "chrome":
+            data = {
+                "traceEvents": [{
+                    "name": record["name"],
+                    "cat": "check",
+                    "ph": "X",
+                    "ts": record["start"] * 1_000_000,
+                    "dur": record["wall_time"] * 1_000_000,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {key: value for key, value in record.items() if key not in ("name", "start", "wall_time")}
+                } for tid, record in enumerate(records, start=1)],
+                "displayTimeUnit": "ms"
+            }
+        else:
+            data = {"checks": records}
+
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def _check_health(runbook, results):
+    """Application responds on its health check path."""
+    return [] if runbook.test_app_health() else ["Application health check failed"]
+
+
+def _check_security(runbook, results):
+    """Security groups have no overly permissive rules."""
+    return runbook.check_security_groups()
+
+
+def _check_logs(runbook, results):
+    """Recent ECS CloudWatch logs are free of errors."""
+    return runbook.check_cloudwatch_logs()
+
+
+def _check_resources(runbook, results):
+    """Inventory of ECS clusters, load balancers, cache clusters and EC2 instances."""
+    return runbook.get_aws_resources()
+
+
+def create_check_registry(config):
+    """Create a registry with the built-in checks plus any configured plugins."""
+    registry = CheckRegistry()
+    registry.register("health", _check_health, cost=1)
+    registry.register("security", _check_security, aws_services=["ec2"], cost=1)
+    registry.register("logs", _check_logs, aws_services=["logs"], cost=3)
+    registry.register("resources", _check_resources, aws_services=["ecs", "elbv2", "elasticache", "ec2"], cost=2)
+
+    checks_config = config.get("checks", {})
+    registry.load_plugins(checks_config.get("plugins_dir", "scripts/runbook_checks"),
+                          checks_config.get("entry_point_group", "runbook.checks"))
+    return registry
+
+
 class InfrastructureRunbook:
     def __init__(self, environment, config_path="scripts/config.json"):
         """Initialize the runbook with the specified environment."""
@@ -46,12 +487,26 @@ class InfrastructureRunbook:
             self.elb = self.session.client('elbv2')
             self.logs = self.session.client('logs')
             self.elasticache = self.session.client('elasticache')
+            self.clients = {
+                "ec2": self.ec2,
+                "ecs": self.ecs,
+                "elbv2": self.elb,
+                "logs": self.logs,
+                "elasticache": self.elasticache
+            }
             self.has_aws_creds = True
         except Exception as e:
             print(f"Warning: Could not initialize AWS session: {e}")
             print("Some features will be limited without AWS credentials")
+            self.clients = {}
             self.has_aws_creds = False
 
+        self.profiler = None
+
+        # Opened on first use so actions that never record runs do not touch the database
+        self.result_store = None
+        self.result_store_lock = threading.Lock()
+
     def _create_default_config(self):
         """Create a default configuration if none exists."""
         return {
@@ -62,7 +517,8 @@ class InfrastructureRunbook:
             },
             "health_check_paths": {
                 "dev": "/health",
-                "prod": "/health"
+                "prod": "/health",
+                "dr-pilot-light": "/health"
             },
             "expected_services": {
                 "dev": ["ecs", "elasticache", "alb"],
@@ -73,9 +529,138 @@ class InfrastructureRunbook:
                 "duration_seconds": 30,
                 "requests_per_second": 5
             },
-            "report_output_dir": "runbook_reports"
+            "capacity_test": {
+                "start_rps": 5,
+                "step_rps": 5,
+                "max_rps": 200,
+                "step_duration_seconds": 30,
+                "min_success_rate": 0.99,
+                "p99_limit_seconds": 1.0,
+                "max_workers": 500
+            },
+            "cost_efficiency": {
+                "infracost_files": {
+                    "dev": "infracost/dev.json",
+                    "prod": "infracost/prod.json"
+                },
+                "expected_peak_rps": {
+                    "dev": 5,
+                    "prod": 50
+                },
+                "hours_per_month": HOURS_PER_MONTH
+            },
+            "regression": {
+                "baseline_runs": 10,
+                "baseline_days": 14,
+                "alpha": 0.01,
+                "min_slowdown": 0.1,
+                "min_baseline_runs": 3,
+                "require_baseline": False
+            },
+            "replay": {
+                "methods": ["GET", "HEAD"],
+                "speed": 1.0,
+                "max_concurrency": 50,
+                "timeout_seconds": 10,
+                "sample_size": 1000,
+                "max_endpoints": 200
+            },
+            "coldstart": {
+                "app_dir": "app",
+                "image_tag": "ecs-app:coldstart",
+                "container_port": 8080,
+                "health_path": "/health",
+                "trials": 10,
+                "timeout_seconds": 60
+            },
+            "checks": {
+                "plugins_dir": "scripts/runbook_checks",
+                "entry_point_group": "runbook.checks",
+                "max_concurrency": 4
+            },
+            "report_output_dir": "runbook_reports",
+            "results_db": None
         }
 
+    def create_clients(self, services):
+        """Create shared boto3 clients for the services.
+
+        boto3 sessions are not thread-safe, so this must run on the main thread
+        before any worker threads use the clients.
+        """
+        for service in services:
+            if service not in self.clients:
+                self.clients[service] = self.session.client(service)
+
+    def get_client(self, service):
+        """Return the shared boto3 client for a service created by create_clients()."""
+        if service not in self.clients:
+            raise KeyError(f"No client for '{service}', declare it in the check's aws_services")
+        return self.clients[service]
+
+    def _get_git_commit(self):
+        """Return the current git commit, preferring the one Jenkins checked out."""
+        if os.environ.get("GIT_COMMIT"):
+            return os.environ["GIT_COMMIT"]
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            return result.stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _get_image_tag(self):
+        """Return the deployed container image tag for the environment."""
+        if os.environ.get("IMAGE_TAG"):
+            return os.environ["IMAGE_TAG"]
+        try:
+            with open(f"{self.env_dir}/terraform.tfvars", 'r') as f:
+                for line in f:
+                    parts = line.split("=", 1)
+                    if len(parts) == 2 and parts[0].strip() == "container_image":
+                        return parts[1].strip().strip('"')
+        except OSError:
+            pass
+        return None
+
+    def _get_result_store_path(self):
+        """Return the results database path.
+
+        Jenkins wipes the workspace after every build, so under Jenkins the path
+        must be set explicitly to persistent storage reachable from the agent.
+        """
+        if os.environ.get("RUNBOOK_RESULTS_DB"):
+            return os.environ["RUNBOOK_RESULTS_DB"]
+        if self.config.get("results_db"):
+            return self.config["results_db"]
+        if os.environ.get("JENKINS_URL") or os.environ.get("JENKINS_HOME"):
+            raise ValueError("Running under Jenkins without a persistent results store, "
+                             "set RUNBOOK_RESULTS_DB or results_db in the config")
+        return os.path.join(self.config.get("report_output_dir", "runbook_reports"), "results.db")
+
+    def _get_result_store(self):
+        """Open the result store on first use, raising OSError, sqlite3.Error or ValueError on failure."""
+        with self.result_store_lock:
+            if self.result_store is None:
+                self.result_store = ResultStore(self._get_result_store_path())
+        return self.result_store
+
+    def _record_run(self, action, passed, metrics, samples=None, image_tag=None):
+        """Record a run in the result store, never failing the calling action.
+
+        image_tag defaults to the image deployed to the environment.
+        """
+        try:
+            self._get_result_store().record_run(self.environment, action, passed, metrics, samples,
+                                                git_commit=self._get_git_commit(),
+                                                image_tag=image_tag or self._get_image_tag())
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"Warning: Could not record {action} run: {e}")
+
     def validate_environment(self):
         """Validate that the environment directory and configuration exist."""
         issues = []
@@ -259,6 +844,7 @@ class InfrastructureRunbook:
         except Exception as e:
             issues.append(f"Error checking security groups: {e}")
 
+        self._record_run("security", not issues, {"issue_count": len(issues)})
         return issues
 
     def check_cloudwatch_logs(self):
@@ -314,6 +900,7 @@ class InfrastructureRunbook:
         except Exception as e:
             log_issues.append(f"Error checking CloudWatch logs: {e}")
 
+        self._record_run("logs", not log_issues, {"issue_count": len(log_issues)})
         return log_issues
 
     def run_load_test(self):
@@ -388,6 +975,8 @@ class InfrastructureRunbook:
                 # Sleep to control request rate
                 time.sleep(1)
 
+            offered_seconds = time.time() - start_time
+
             # Wait for all futures to complete
             for future in futures:
                 result = future.result()
@@ -404,6 +993,8 @@ class InfrastructureRunbook:
 
                 results["response_times"].append(result["elapsed"])
 
+        elapsed_seconds = time.time() - start_time
+
         # Calculate statistics
         if results["response_times"]:
             results["avg_response_time"] = sum(results["response_times"]) / len(results["response_times"])
@@ -413,6 +1004,10 @@ class InfrastructureRunbook:
             results["avg_response_time"] = 0
             results["max_response_time"] = 0
             results["min_response_time"] = 0
+        results["p50_response_time"] = _percentile(results["response_times"], 50)
+        results["p99_response_time"] = _percentile(results["response_times"], 99)
+        # The test is open-loop, so this is the offered load that was served, not the capacity
+        results["throughput_rps"] = results["successful_requests"] / offered_seconds if offered_seconds > 0 else 0
 
         # Print results
         print("\nLoad Test Results:")
@@ -422,6 +1017,10 @@ class InfrastructureRunbook:
         print(f"Average Response Time: {results['avg_response_time']:.4f} seconds")
         print(f"Min Response Time: {results['min_response_time']:.4f} seconds")
         print(f"Max Response Time: {results['max_response_time']:.4f} seconds")
+        print(f"p50 Response Time: {results['p50_response_time']:.4f} seconds")
+        print(f"p99 Response Time: {results['p99_response_time']:.4f} seconds")
+        print(f"Served Throughput: {results['throughput_rps']:.2f} successful requests/second "
+              f"(offered load {requests_per_second} RPS, use capacity-test for capacity)")
 
         if results["errors"]:
             print("\nSample Errors:")
@@ -435,8 +1034,913 @@ class InfrastructureRunbook:
         passed = success_rate >= 0.9  # At least 90% success rate is considered passing
 
         print(f"\nLoad Test {'PASSED' if passed else 'FAILED'}")
+
+        # Save a summary so other actions (e.g. cost-efficiency) can use the measured numbers
+        report_dir = self.config.get("report_output_dir", "runbook_reports")
+        if not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        results_file = os.path.join(report_dir, f"{self.environment}_load_test_{timestamp}.json")
+        summary = {key: value for key, value in results.items() if key not in ("response_times", "errors")}
+        summary.update({
+            "environment": self.environment,
+            "url": url,
+            "timestamp": timestamp,
+            "duration_seconds": elapsed_seconds,
+            "offered_rps": requests_per_second,
+            "concurrent_users": concurrent_users,
+            "success_rate": success_rate,
+            "passed": passed
+        })
+        with open(results_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Load test results saved: {results_file}")
+
+        self._record_run("load-test", passed, summary, results["response_times"])
+
+        return passed
+
+    def _run_load_step(self, url, rps, duration_seconds, max_workers):
+        """Offer a fixed request rate for a while and measure what was actually served."""
+        def make_request(scheduled_at):
+            try:
+                response = requests.get(url, timeout=5)
+                success = response.status_code == 200
+            except requests.exceptions.RequestException:
+                success = False
+            # Measured from the scheduled time so client-side queueing shows up as latency too
+            return success, time.time() - scheduled_at
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            start_time = time.time()
+            # Space requests evenly rather than bursting rps requests at the start of each second
+            for i in range(rps * duration_seconds):
+                scheduled_at = start_time + i / rps
+                remaining = scheduled_at - time.time()
+                if remaining > 0:
+                    time.sleep(remaining)
+                futures.append(executor.submit(make_request, scheduled_at))
+            remaining = start_time + duration_seconds - time.time()
+            if remaining > 0:
+                time.sleep(remaining)
+            outcomes = [future.result() for future in futures]
+
+        successes = sum(1 for success, _ in outcomes if success)
+        response_times = [elapsed for _, elapsed in outcomes]
+        return {
+            "offered_rps": rps,
+            "throughput_rps": successes / duration_seconds,
+            "success_rate": successes / len(outcomes) if outcomes else 0,
+            "p50_response_time": _percentile(response_times, 50),
+            "p99_response_time": _percentile(response_times, 99)
+        }
+
+    def run_capacity_test(self):
+        """Step up the offered load until the success rate or p99 limit is breached."""
+        outputs = self.get_terraform_outputs()
+        if not outputs:
+            print("Could not get infrastructure outputs")
+            return False
+
+        # Get the ALB DNS name from outputs
+        alb_dns = None
+        for key in outputs:
+            if "alb" in key.lower() and "dns" in key.lower():
+                alb_dns = outputs[key]["value"]
+                break
+
+        if not alb_dns:
+            print("Could not find ALB DNS name in Terraform outputs")
+            return False
+
+        url = f"http://{alb_dns}/"
+
+        config = self.config.get("capacity_test", {})
+        start_rps = config.get("start_rps", 5)
+        step_rps = config.get("step_rps", 5)
+        max_rps = config.get("max_rps", 200)
+        step_duration = config.get("step_duration_seconds", 30)
+        min_success_rate = config.get("min_success_rate", 0.99)
+        p99_limit = config.get("p99_limit_seconds", 1.0)
+        max_workers = config.get("max_workers", 500)
+
+        print(f"Running capacity test against {url}")
+        print(f"- Steps: {start_rps} to {max_rps} RPS in steps of {step_rps}, {step_duration} seconds each")
+        print(f"- Limits: success rate >= {min_success_rate}, p99 <= {p99_limit} seconds")
+
+        steps = []
+        sustainable_step = None
+        saturated = False
+        rps = start_rps
+        while rps <= max_rps:
+            step = self._run_load_step(url, rps, step_duration, min(max(rps * 5, 10), max_workers))
+            step["within_limits"] = step["success_rate"] >= min_success_rate and step["p99_response_time"] <= p99_limit
+            steps.append(step)
+            print(f"  {rps} RPS offered: {step['throughput_rps']:.2f} served, "
+                  f"success {step['success_rate'] * 100:.1f}%, p99 {step['p99_response_time']:.4f}s"
+                  f"{'' if step['within_limits'] else ' (limit breached)'}")
+            if not step["within_limits"]:
+                saturated = True
+                break
+            sustainable_step = step
+            rps += step_rps
+
+        sustainable_rps = sustainable_step["throughput_rps"] if sustainable_step else 0
+        if not saturated:
+            print(f"\nLimits were not reached up to {max_rps} RPS, "
+                  f"{sustainable_rps:.2f} RPS is only a lower bound on capacity")
+        else:
+            print(f"\nSustainable throughput: {sustainable_rps:.2f} RPS")
+
+        report_dir = self.config.get("report_output_dir", "runbook_reports")
+        if not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        results_file = os.path.join(report_dir, f"{self.environment}_capacity_test_{timestamp}.json")
+        summary = {
+            "environment": self.environment,
+            "url": url,
+            "timestamp": timestamp,
+            "steps": steps,
+            "saturated": saturated,
+            "sustainable_rps": sustainable_rps,
+            "p99_response_time": sustainable_step["p99_response_time"] if sustainable_step else None,
+            "passed": sustainable_step is not None
+        }
+        with open(results_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Capacity test results saved: {results_file}")
+
+        self._record_run("capacity-test", summary["passed"], summary)
+        return summary["passed"]
+
+    def get_infracost_breakdown(self, infracost_file=None):
+        """Parse infracost JSON output and group monthly costs by component."""
+        if not infracost_file:
+            infracost_file = self.config.get("cost_efficiency", {}).get("infracost_files", {}).get(self.environment)
+
+        try:
+            if infracost_file and os.path.isfile(infracost_file):
+                with open(infracost_file, 'r') as f:
+                    data = json.load(f)
+            else:
+                # No saved breakdown, ask infracost to price the environment directly
+                print(f"Infracost output not found, running infracost breakdown for {self.env_dir}")
+                result = subprocess.run(
+                    ["infracost", "breakdown", "--path", self.env_dir, "--format", "json"],
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
+                data = json.loads(result.stdout)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Failed to get infracost breakdown: {getattr(e, 'stderr', None) or e}")
+            return None
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse infracost output: {e}")
+            return None
+
+        components = {name: 0.0 for name in COST_COMPONENTS}
+        components["Other"] = 0.0
+
+        for project in data.get("projects", []):
+            for resource in (project.get("breakdown") or {}).get("resources", []):
+                resource_type = resource.get("resourceType", "")
+                monthly_cost = float(resource.get("monthlyCost") or 0)
+
+                component = "Other"
+                for name, prefixes in COST_COMPONENTS.items():
+                    if resource_type.startswith(prefixes):
+                        component = name
+                        break
+                components[component] += monthly_cost
+
+        return {
+            "components": components,
+            "total_monthly_cost": sum(components.values())
+        }
+
+    def get_latest_test_results(self, results_file=None):
+        """Load a saved test summary, defaulting to the latest capacity test, then the latest load test."""
+        if not results_file:
+            report_dir = self.config.get("report_output_dir", "runbook_reports")
+            for kind in ("capacity_test", "load_test"):
+                prefix = f"{self.environment}_{kind}_"
+                candidates = []
+                if os.path.isdir(report_dir):
+                    candidates = sorted(name for name in os.listdir(report_dir)
+                                        if name.startswith(prefix) and name.endswith(".json"))
+                if candidates:
+                    results_file = os.path.join(report_dir, candidates[-1])
+                    break
+            else:
+                print(f"No capacity or load test results found for '{self.environment}' in {report_dir}")
+                return None
+
+        try:
+            with open(results_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read test results {results_file}: {e}")
+            return None
+
+    def calculate_cost_efficiency(self, infracost_file=None, load_test_file=None):
+        """Combine infracost costs with measured capacity (or offered load) throughput."""
+        costs = self.get_infracost_breakdown(infracost_file)
+        load_test = self.get_latest_test_results(load_test_file)
+        if not costs or not load_test:
+            return None
+
+        config = self.config.get("cost_efficiency", {})
+        hours_per_month = config.get("hours_per_month", HOURS_PER_MONTH)
+        expected_peak_rps = config.get("expected_peak_rps", {}).get(self.environment, 0)
+
+        # Headroom only means something when the test pushed the environment to its limits
+        if "sustainable_rps" in load_test:
+            sustainable_rps = load_test["sustainable_rps"]
+            saturated = load_test.get("saturated", False)
+            throughput_basis = "capacity" if saturated else "capacity lower bound"
+        else:
+            sustainable_rps = load_test.get("throughput_rps", 0)
+            saturated = False
+            throughput_basis = "offered load"
+
+        if not saturated:
+            print(f"Warning: the {self.environment} test did not saturate the environment, "
+                  f"throughput is {throughput_basis} and headroom is not computed (run capacity-test)")
+
+        monthly_cost = costs["total_monthly_cost"]
+        monthly_requests = sustainable_rps * 3600 * hours_per_month
+        headroom_rps = sustainable_rps - expected_peak_rps if saturated else None
+
+        def per_million(cost):
+            return cost / (monthly_requests / 1_000_000) if monthly_requests > 0 else None
+
+        return {
+            "environment": self.environment,
+            "monthly_cost": monthly_cost,
+            "component_costs": costs["components"],
+            "component_cost_per_million_requests": {name: per_million(cost)
+                                                    for name, cost in costs["components"].items()},
+            "sustainable_rps": sustainable_rps,
+            "throughput_basis": throughput_basis,
+            "p99_response_time": load_test.get("p99_response_time"),
+            "expected_peak_rps": expected_peak_rps,
+            "cost_per_million_requests": per_million(monthly_cost),
+            "headroom_rps": headroom_rps,
+            "headroom_rps_per_dollar": headroom_rps / monthly_cost if headroom_rps is not None and monthly_cost > 0
+            else None,
+            "load_test_timestamp": load_test.get("timestamp")
+        }
+
+    def detect_regression(self, action="load-test", metric="p99_response_time", require_baseline=None):
+        """Compare the latest recorded run's metric against a baseline window of earlier runs.
+
+        Returns True if the caller should fail: a statistically significant slowdown,
+        a missing metric or unreadable store, or no baseline when one is required.
+        """
+        config = self.config.get("regression", {})
+        baseline_runs = config.get("baseline_runs", 10)
+        baseline_days = config.get("baseline_days", 14)
+        min_baseline_runs = max(config.get("min_baseline_runs", 3), 2)
+        alpha = config.get("alpha", 0.01)
+        min_slowdown = config.get("min_slowdown", 0.1)
+        if require_baseline is None:
+            require_baseline = config.get("require_baseline", False)
+
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=baseline_days)
+        try:
+            store = self._get_result_store()
+            runs = store.get_runs(self.environment, action, since=since, limit=baseline_runs + 1)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"FAILED: could not read the result store: {e}")
+            return True
+        if not runs:
+            print(f"No recorded '{action}' runs for '{self.environment}' in {store.db_path}")
+            if require_baseline:
+                print("FAILED: a baseline is required")
+            return require_baseline
+
+        latest, baseline = runs[0], runs[1:]
+        latest_value = latest["metrics"].get(metric)
+        if not isinstance(latest_value, (int, float)):
+            print(f"FAILED: metric '{metric}' is not recorded for the latest '{action}' run "
+                  f"(recorded metrics: {', '.join(sorted(latest['metrics'])) or 'none'})")
+            return True
+        baseline_values = [run["metrics"][metric] for run in baseline
+                           if isinstance(run["metrics"].get(metric), (int, float))]
+        if len(baseline_values) < min_baseline_runs:
+            print(f"Only {len(baseline_values)} baseline '{action}' runs for '{self.environment}' in {store.db_path}, "
+                  f"at least {min_baseline_runs} are needed to detect regressions")
+            if require_baseline:
+                print("FAILED: a baseline is required")
+            return require_baseline
+
+        baseline_value = sorted(baseline_values)[len(baseline_values) // 2]
+        change = (latest_value - baseline_value) / baseline_value if baseline_value else 0
+
+        # Latency-like metrics vary multiplicatively between runs, so compare them on a log scale
+        if latest_value > 0 and all(value > 0 for value in baseline_values):
+            p_value = _prediction_p_value(math.log(latest_value), [math.log(value) for value in baseline_values])
+        else:
+            p_value = _prediction_p_value(latest_value, baseline_values)
+
+        print(tabulate.tabulate([
+            ["Latest run", latest["started_at"], latest["git_commit"] or "N/A", latest["image_tag"] or "N/A",
+             f"{latest_value:.4f}"],
+            [f"Baseline median ({len(baseline_values)} runs)", baseline[-1]["started_at"], "", "",
+             f"{baseline_value:.4f}"],
+        ], headers=["Run", "Started", "Commit", "Image", metric], tablefmt="grid"))
+        print(f"Change: {change * 100:+.1f}% (p-value {p_value:.4g}, alpha {alpha})")
+
+        regressed = p_value < alpha and change >= min_slowdown
+        if regressed:
+            print(f"REGRESSION: {metric} for '{action}' is significantly slower than the baseline")
+        else:
+            print("No significant regression detected")
+        return regressed
+
+    def _iter_access_log_files(self, source):
+        """Yield (name, opener) pairs for ALB access log files in a local directory or S3 prefix.
+
+        Each opener returns a text stream, so files are only opened once they are read.
+        """
+        if source.startswith("s3://"):
+            if not self.has_aws_creds:
+                print("AWS credentials not available")
+                return
+            bucket, _, prefix = source[len("s3://"):].partition("/")
+            self.create_clients(['s3'])
+            s3 = self.get_client('s3')
+
+            def open_s3(key):
+                body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+                raw = gzip.GzipFile(fileobj=body) if key.endswith(".gz") else body
+                return io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+
+            paginator = s3.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    yield f"s3://{bucket}/{obj['Key']}", lambda key=obj["Key"]: open_s3(key)
+        else:
+            for root, _, files in sorted(os.walk(source)):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if name.endswith(".gz"):
+                        yield path, lambda path=path: gzip.open(path, 'rt', encoding="utf-8", errors="replace")
+                    elif name.endswith(".log"):
+                        yield path, lambda path=path: open(path, 'r', encoding="utf-8", errors="replace")
+
+    def _parse_access_log(self, name, opener, methods=None):
+        """Stream parsed entries from a single ALB access log file line by line.
+
+        Unreadable files are reported and skipped.
+        """
+        try:
+            with opener() as stream:
+                for line in stream:
+                    match = ALB_LOG_PATTERN.match(line)
+                    if not match:
+                        continue
+
+                    request_parts = match.group("request").split(" ", 2)
+                    if len(request_parts) != 3 or request_parts[0] == "-":
+                        continue
+                    method, url, _ = request_parts
+                    if methods and method not in methods:
+                        continue
+
+                    parsed_url = urlsplit(url)
+                    path = parsed_url.path or "/"
+                    try:
+                        arrival = datetime.datetime.fromisoformat(
+                            match.group("request_creation_time").replace("Z", "+00:00"))
+                        target_time = float(match.group("target_processing_time"))
+                    except ValueError:
+                        continue
+
+                    yield {
+                        "method": method,
+                        "path": path + (f"?{parsed_url.query}" if parsed_url.query else ""),
+                        "endpoint": f"{method} {self._normalize_endpoint(path)}",
+                        "arrival": arrival.timestamp(),
+                        "target_processing_time": target_time,
+                        "status_code": match.group("elb_status_code")
+                    }
+        except (OSError, EOFError, gzip.BadGzipFile, ClientError) as e:
+            print(f"Warning: Skipping access log {name}: {e}")
+
+    def iter_access_log_entries(self, source, methods=None):
+        """Stream ALB access log entries from a local directory or S3 prefix in arrival order.
+
+        ALB writes one file per node per 5-minute interval. Files are grouped by the
+        interval in their name and merged by arrival time within each interval, so
+        only one interval's files (one per node) are open at a time. Files not named
+        the way ALB names them are merged together as a single group.
+        """
+        def window(log_file):
+            match = ALB_LOG_FILE_WINDOW_PATTERN.search(os.path.basename(log_file[0]))
+            return match.group(1) if match else ""
+
+        log_files = sorted(self._iter_access_log_files(source), key=lambda log_file: (window(log_file), log_file[0]))
+        for _, group in itertools.groupby(log_files, key=window):
+            streams = [self._parse_access_log(name, opener, methods) for name, opener in group]
+            yield from heapq.merge(*streams, key=lambda entry: entry["arrival"])
+
+    @staticmethod
+    def _normalize_endpoint(path):
+        """Collapse id-like path segments so requests group by endpoint."""
+        return "/".join("{id}" if ID_SEGMENT_PATTERN.match(segment) else segment
+                        for segment in path.split("/"))
+
+    def replay_traffic(self, source, target_url=None, speed=None):
+        """Replay ALB access log traffic against the environment, preserving inter-arrival times."""
+        config = self.config.get("replay", {})
+        methods = config.get("methods", ["GET", "HEAD"])
+        speed = speed or config.get("speed", 1.0)
+        max_concurrency = config.get("max_concurrency", 50)
+        timeout = config.get("timeout_seconds", 10)
+        max_requests = config.get("max_requests")
+        sample_size = config.get("sample_size", 1000)
+        max_endpoints = config.get("max_endpoints", 200)
+
+        if not target_url:
+            outputs = self.get_terraform_outputs()
+            if not outputs:
+                print("Could not get infrastructure outputs")
+                return False
+
+            alb_dns = None
+            for key in outputs:
+                if "alb" in key.lower() and "dns" in key.lower():
+                    alb_dns = outputs[key]["value"]
+                    break
+
+            if not alb_dns:
+                print("Could not find ALB DNS name in Terraform outputs")
+                return False
+            target_url = f"http://{alb_dns}"
+        target_url = target_url.rstrip("/")
+
+        print(f"Replaying traffic from {source} against {target_url}")
+        print(f"- Speed: {speed}x")
+        print(f"- Methods: {', '.join(methods)}")
+        print(f"- Max concurrency: {max_concurrency}")
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        # Only bounded stats are kept, so memory does not grow with the size of the logs
+        endpoints = {}
+        all_response_times = Reservoir(sample_size)
+        lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(max_concurrency)
+
+        def replay_request(entry):
+            try:
+                start_time = time.time()
+                try:
+                    response = session.request(entry["method"], target_url + entry["path"],
+                                               timeout=timeout, allow_redirects=False)
+                    error = response.status_code >= 500
+                except Exception:
+                    # Any failure (not only RequestException) counts as an error for the endpoint
+                    error = True
+                elapsed = time.time() - start_time
+
+                with lock:
+                    endpoint = entry["endpoint"]
+                    if endpoint not in endpoints and len(endpoints) >= max_endpoints:
+                        endpoint = "(other endpoints)"
+                    stats = endpoints.setdefault(endpoint, {
+                        "requests": 0,
+                        "errors": 0,
+                        "response_times": Reservoir(sample_size),
+                        "original_response_times": Reservoir(sample_size)
+                    })
+                    stats["requests"] += 1
+                    stats["errors"] += int(error)
+                    stats["response_times"].add(elapsed)
+                    all_response_times.add(elapsed)
+                    if entry["target_processing_time"] >= 0:
+                        stats["original_response_times"].add(entry["target_processing_time"])
+            finally:
+                in_flight.release()
+
+        first_arrival = None
+        replay_start = time.monotonic()
+        submitted = 0
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for entry in self.iter_access_log_entries(source, methods):
+                if first_arrival is None:
+                    first_arrival = entry["arrival"]
+
+                # Wait until the request's original offset (scaled by speed); late entries go out immediately
+                delay = (entry["arrival"] - first_arrival) / speed - (time.monotonic() - replay_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+                in_flight.acquire()
+                executor.submit(replay_request, entry)
+
+                submitted += 1
+                if max_requests and submitted >= max_requests:
+                    break
+
+        if not endpoints:
+            print("No requests replayed")
+            return False
+
+        table = []
+        total_requests = 0
+        total_errors = 0
+        for endpoint, stats in sorted(endpoints.items(), key=lambda item: item[1]["requests"], reverse=True):
+            total_requests += stats["requests"]
+            total_errors += stats["errors"]
+            original_times = stats["original_response_times"].values
+            table.append([
+                endpoint,
+                stats["requests"],
+                stats["errors"],
+                f"{_percentile(stats['response_times'].values, 50):.4f}",
+                f"{_percentile(stats['response_times'].values, 99):.4f}",
+                f"{_percentile(original_times, 99):.4f}" if original_times else "N/A"
+            ])
+
+        print("\nReplay Results by Endpoint:")
+        print(tabulate.tabulate(table,
+                                headers=["Endpoint", "Requests", "Errors", "p50 (s)", "p99 (s)", "Original p99 (s)"],
+                                tablefmt="grid"))
+
+        success_rate = (total_requests - total_errors) / total_requests
+        passed = success_rate >= 0.9
+        print(f"\nTotal Requests: {total_requests}")
+        print(f"Errors: {total_errors}")
+        print(f"Replay duration: {time.monotonic() - replay_start:.1f} seconds")
+        print(f"\nReplay {'PASSED' if passed else 'FAILED'}")
+
+        self._record_run("replay", passed, {
+            "source": source,
+            "target_url": target_url,
+            "speed": speed,
+            "total_requests": total_requests,
+            "errors": total_errors,
+            "p50_response_time": _percentile(all_response_times.values, 50),
+            "p99_response_time": _percentile(all_response_times.values, 99),
+            "endpoints": {endpoint: {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "p99_response_time": _percentile(stats["response_times"].values, 99)
+            } for endpoint, stats in endpoints.items()}
+        }, all_response_times.values)
         return passed
 
+    def _get_image_layers(self, image):
+        """Return the image id, total size and per-layer sizes for a local Docker image."""
+        try:
+            inspect_result = subprocess.run(
+                ["docker", "image", "inspect", "--format", "{{.Id}} {{.Size}}", image],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            history = subprocess.run(
+                ["docker", "history", "--no-trunc", "--human=false", "--format", "{{.Size}}\t{{.CreatedBy}}", image],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Failed to inspect image {image}: {getattr(e, 'stderr', None) or e}")
+            return None
+
+        image_id, size = inspect_result.stdout.split()
+        layers = []
+        for line in history.stdout.splitlines():
+            layer_size, _, created_by = line.partition("\t")
+            if layer_size.isdigit() and int(layer_size) > 0:
+                layers.append({"size_bytes": int(layer_size), "created_by": created_by.strip()[:80]})
+
+        return {"image_id": image_id, "size_bytes": int(size), "layers": layers}
+
+    @staticmethod
+    def _container_running(container_id):
+        """Return whether a Docker container is still running."""
+        result = subprocess.run(
+            ["docker", "inspect", "-f", "{{.State.Running}}", container_id],
+            capture_output=True,
+            text=True
+        )
+        return result.stdout.strip() == "true"
+
+    @staticmethod
+    def _wait_for_port(port, deadline, is_running):
+        """Wait until something accepts and holds a connection on the port, returning when it first did.
+
+        Gives up early (returning None) once is_running() reports the app has exited.
+        """
+        next_liveness_check = time.monotonic()
+        while time.monotonic() < deadline:
+            connected_at = time.monotonic()
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5) as sock:
+                    # Docker's userland proxy accepts before the app listens and then drops the connection,
+                    # so only count the port as open once the connection stays up
+                    sock.settimeout(0.05)
+                    try:
+                        if sock.recv(1) == b"":
+                            raise ConnectionResetError
+                    except socket.timeout:
+                        pass
+                    return connected_at
+            except OSError:
+                pass
+            if time.monotonic() >= next_liveness_check:
+                if not is_running():
+                    return None
+                next_liveness_check = time.monotonic() + 0.25
+            time.sleep(0.01)
+        return None
+
+    @staticmethod
+    def _wait_for_health(url, deadline, is_running):
+        """Poll the health endpoint until it returns HTTP 200, returning when it did.
+
+        Gives up early (returning None) once is_running() reports the app has exited.
+        """
+        next_liveness_check = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(url, timeout=1).status_code == 200:
+                    return time.monotonic()
+            except requests.exceptions.RequestException:
+                pass
+            if time.monotonic() >= next_liveness_check:
+                if not is_running():
+                    return None
+                next_liveness_check = time.monotonic() + 0.25
+            time.sleep(0.01)
+        return None
+
+    def measure_cold_start(self, mode="docker", trials=None):
+        """Benchmark how quickly the app container (or process) starts serving traffic."""
+        config = self.config.get("coldstart", {})
+        app_dir = config.get("app_dir", "app")
+        image = config.get("image_tag", "ecs-app:coldstart")
+        container_port = config.get("container_port", 8080)
+        health_path = config.get("health_path", "/health")
+        timeout = config.get("timeout_seconds", 60)
+        trials = trials or config.get("trials", 10)
+
+        dockerfile = os.path.join(app_dir, "Dockerfile")
+        try:
+            with open(dockerfile, 'rb') as f:
+                dockerfile_content = f.read()
+        except OSError as e:
+            print(f"Could not read {dockerfile}: {e}")
+            return False
+        base_images = [line.split()[1] for line in dockerfile_content.decode().splitlines()
+                       if line.strip().upper().startswith("FROM ") and len(line.split()) > 1]
+
+        image_info = None
+        if mode == "docker":
+            print(f"Building image {image} from {app_dir}")
+            try:
+                subprocess.run(["docker", "build", "-t", image, app_dir], capture_output=True, text=True, check=True)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Failed to build image: {getattr(e, 'stderr', None) or e}")
+                return False
+
+            image_info = self._get_image_layers(image)
+            if not image_info:
+                return False
+
+            print(f"\nImage {image} ({image_info['image_id'][:19]}): {image_info['size_bytes'] / 1024 / 1024:.1f} MB")
+            print(tabulate.tabulate(
+                [[f"{layer['size_bytes'] / 1024 / 1024:.2f}", layer["created_by"]] for layer in image_info["layers"]],
+                headers=["Layer size (MB)", "Created by"],
+                tablefmt="grid"))
+
+        print(f"\nRunning {trials} cold start trials ({mode})")
+
+        port_open_times = []
+        health_times = []
+        failures = 0
+
+        for trial in range(trials):
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                host_port = sock.getsockname()[1]
+
+            start = time.monotonic()
+            deadline = start + timeout
+            container_id = None
+            process = None
+            try:
+                if mode == "docker":
+                    result = subprocess.run(
+                        ["docker", "run", "-d", "-p", f"127.0.0.1:{host_port}:{container_port}", image],
+                        capture_output=True,
+                        text=True,
+                        check=True
+                    )
+                    container_id = result.stdout.strip()
+                else:
+                    process = subprocess.Popen(
+                        ["node", "index.js"],
+                        cwd=app_dir,
+                        env=dict(os.environ, PORT=str(host_port)),
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL
+                    )
+
+                if container_id:
+                    def is_running():
+                        return self._container_running(container_id)
+                else:
+                    def is_running():
+                        return process.poll() is None
+
+                port_open = self._wait_for_port(host_port, deadline, is_running)
+                healthy = self._wait_for_health(f"http://127.0.0.1:{host_port}{health_path}", deadline,
+                                                is_running) if port_open else None
+                exited = healthy is None and not is_running()
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Trial {trial + 1} failed to start: {getattr(e, 'stderr', None) or e}")
+                port_open = healthy = None
+                exited = True
+            finally:
+                if container_id:
+                    subprocess.run(["docker", "rm", "-f", container_id], capture_output=True)
+                if process:
+                    process.terminate()
+                    process.wait()
+
+            if port_open is None or healthy is None:
+                failures += 1
+                if exited:
+                    print(f"Trial {trial + 1}: the app exited before becoming healthy")
+                else:
+                    print(f"Trial {trial + 1}: did not become healthy within {timeout} seconds")
+                continue
+
+            port_open_times.append(port_open - start)
+            health_times.append(healthy - start)
+            print(f"Trial {trial + 1}: port open {port_open - start:.3f}s, first {health_path} 200 {healthy - start:.3f}s")
+
+        if not health_times:
+            print("No successful cold start trials")
+            return False
+
+        table = []
+        for label, values in (("Port open (s)", port_open_times), (f"First {health_path} 200 (s)", health_times)):
+            table.append([label, f"{min(values):.3f}", f"{_percentile(values, 50):.3f}",
+                          f"{_percentile(values, 90):.3f}", f"{_percentile(values, 99):.3f}", f"{max(values):.3f}"])
+        print("\nCold Start Results:")
+        print(tabulate.tabulate(table, headers=["Metric", "Min", "p50", "p90", "p99", "Max"], tablefmt="grid"))
+
+        passed = failures == 0
+        print(f"\nCold Start {'PASSED' if passed else 'FAILED'} ({failures} failed trials)")
+
+        self._record_run("coldstart", passed, {
+            "mode": mode,
+            "trials": trials,
+            "failures": failures,
+            "dockerfile_sha256": hashlib.sha256(dockerfile_content).hexdigest(),
+            "base_images": base_images,
+            "image_id": image_info["image_id"] if image_info else None,
+            "image_size_bytes": image_info["size_bytes"] if image_info else None,
+            "layers": image_info["layers"] if image_info else [],
+            "p50_port_open_seconds": _percentile(port_open_times, 50),
+            "p99_port_open_seconds": _percentile(port_open_times, 99),
+            "p50_first_health_seconds": _percentile(health_times, 50),
+            "p99_first_health_seconds": _percentile(health_times, 99)
+        }, health_times, image_tag=f"{image}@{image_info['image_id']}" if image_info else "local-process")
+        return passed
+
+    async def _run_checks_async(self, registry, order, max_concurrency):
+        """Run checks concurrently, each starting once its dependencies have finished."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks = {}
+        outcomes = {}
+
+        async def run_check(name):
+            check = registry.checks[name]
+            dependencies = check["depends_on"]
+            await asyncio.gather(*(tasks[dep] for dep in dependencies))
+
+            failed_deps = [dep for dep in dependencies if outcomes[dep]["status"] in ("error", "skipped")]
+            if failed_deps:
+                outcomes[name] = {"status": "skipped", "issues": [f"Dependency failed: {', '.join(failed_deps)}"]}
+                return
+            if check["aws_services"] and not self.has_aws_creds:
+                outcomes[name] = {"status": "skipped", "issues": ["AWS credentials not available"]}
+                return
+
+            results = {dep: outcomes[dep]["result"] for dep in dependencies}
+            func = check["func"]
+
+            async def call():
+                if inspect.iscoroutinefunction(func):
+                    return await func(self, results)
+                return await asyncio.to_thread(func, self, results)
+
+            async with semaphore:
+                try:
+                    result = await self.profiler.profile(name, call)
+                except Exception as e:
+                    outcomes[name] = {"status": "error", "issues": [f"Check raised an exception: {e}"]}
+                    return
+
+            if isinstance(result, list):
+                issues = [str(issue) for issue in result]
+                passed = not issues
+            elif isinstance(result, bool):
+                issues = []
+                passed = result
+            else:
+                issues = []
+                passed = True
+            outcomes[name] = {"status": "passed" if passed else "failed", "issues": issues, "result": result}
+
+        for name in order:
+            tasks[name] = asyncio.create_task(run_check(name))
+        await asyncio.gather(*tasks.values())
+        return outcomes
+
+    def run_checks(self, names=None, profile_output=None, profile_format="json"):
+        """Run registered checks and their dependencies through the shared async runtime."""
+        registry = create_check_registry(self.config)
+        try:
+            order = registry.resolve(names)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+
+        # Create every client the checks declare up front, on this thread, so checks only share them
+        self.profiler = CheckProfiler()
+        if self.has_aws_creds:
+            services = {service for name in order for service in registry.checks[name]["aws_services"]}
+            self.create_clients(sorted(services))
+            for client in self.clients.values():
+                self.profiler.attach(client)
+
+        max_concurrency = self.config.get("checks", {}).get("max_concurrency", 4)
+        print(f"Running checks: {', '.join(order)}")
+        outcomes = asyncio.run(self._run_checks_async(registry, order, max_concurrency))
+
+        profile = {record["name"]: record for record in self.profiler.summary()}
+        table = []
+        for name in order:
+            record = profile.get(name, {})
+            table.append([
+                name,
+                outcomes[name]["status"].upper(),
+                len(outcomes[name]["issues"]),
+                f"{record.get('wall_time', 0):.3f}",
+                record.get("api_calls", 0),
+                record.get("retries", 0),
+                record.get("throttles", 0),
+                record.get("bytes_sent", 0) + record.get("bytes_received", 0)
+            ])
+        print(tabulate.tabulate(table,
+                                headers=["Check", "Status", "Issues", "Wall time (s)", "API calls",
+                                         "Retries", "Throttles", "Bytes"],
+                                tablefmt="grid"))
+
+        for name in order:
+            for issue in outcomes[name]["issues"]:
+                print(f"- [{name}] {issue}")
+
+        if profile_output:
+            self.profiler.export(profile_output, profile_format)
+            print(f"Check profile saved: {profile_output}")
+
+        passed = all(outcome["status"] in ("passed", "skipped") for outcome in outcomes.values())
+        self._record_run("checks", passed, {
+            "checks": {name: {"status": outcomes[name]["status"], "issue_count": len(outcomes[name]["issues"])}
+                       for name in order},
+            "profile": list(profile.values()),
+            "wall_time": max((record["start"] + record["wall_time"] for record in profile.values()), default=0)
+        })
+        self.profiler = None
+        return passed
+
+    def list_checks(self):
+        """Print the registered checks and their metadata."""
+        registry = create_check_registry(self.config)
+        table = [[check["name"], ", ".join(check["depends_on"]) or "-", ", ".join(check["aws_services"]) or "-",
+                  check["cost"], check["description"]] for check in registry.checks.values()]
+        print(tabulate.tabulate(table,
+                                headers=["Check", "Depends on", "AWS services", "Cost", "Description"],
+                                tablefmt="grid"))
+
     def compare_environments(self, other_env):
         """Compare this environment with another environment."""
         other_runbook = InfrastructureRunbook(other_env)
@@ -663,18 +2167,54 @@ class InfrastructureRunbook:
             f.write(html)
 
         print(f"Report generated: {report_file}")
+        self._record_run("report", health_status and not sg_issues, {
+            "health_check": health_status,
+            "security_issue_count": len(sg_issues),
+            "log_issue_count": len(log_issues),
+            "report_file": report_file
+        })
         return report_file
 
 def main():
     """Main entry point for the runbook script."""
     parser = argparse.ArgumentParser(description="Infrastructure Runbook for ECS AWS Environment")
     parser.add_argument("action", choices=["test", "validate", "health-check", "resources",
-                                           "security", "logs", "load-test", "compare", "report"],
+                                           "security", "logs", "load-test", "capacity-test", "compare", "report",
+                                           "cost-efficiency", "regress", "replay", "coldstart", "checks"],
                         help="Action to perform")
-    parser.add_argument("environment", choices=["dev", "prod"],
+    parser.add_argument("environment", choices=["dev", "prod", "dr-pilot-light"],
                         help="Environment to target")
-    parser.add_argument("--compare-with", choices=["dev", "prod"],
-                        help="Second environment for comparison (use with compare action)")
+    parser.add_argument("--compare-with", choices=["dev", "prod", "dr-pilot-light"],
+                        help="Second environment for comparison (use with compare or cost-efficiency action)")
+    parser.add_argument("--infracost-file",
+                        help="Infracost JSON output for the environment (use with cost-efficiency action)")
+    parser.add_argument("--load-test-file",
+                        help="Saved capacity or load test results, defaults to the latest capacity test "
+                             "(use with cost-efficiency action)")
+    parser.add_argument("--regress-action", default="load-test",
+                        help="Recorded action to check for regressions (use with regress action)")
+    parser.add_argument("--regress-metric", default="p99_response_time",
+                        help="Metric to compare against the baseline (use with regress action)")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="Fail when there are no baseline runs to compare against (use with regress action)")
+    parser.add_argument("--replay-source",
+                        help="Directory or s3://bucket/prefix of ALB access logs (use with replay action)")
+    parser.add_argument("--target-url",
+                        help="Base URL to replay against, defaults to the environment's ALB (use with replay action)")
+    parser.add_argument("--speed", type=float,
+                        help="Replay speed multiplier, 1.0 keeps original timing (use with replay action)")
+    parser.add_argument("--mode", choices=["docker", "process"], default="docker",
+                        help="Start the app as a container or a local node process (use with coldstart action)")
+    parser.add_argument("--trials", type=int,
+                        help="Number of cold start trials (use with coldstart action)")
+    parser.add_argument("--checks",
+                        help="Comma-separated checks to run, defaults to all registered checks (use with checks action)")
+    parser.add_argument("--list-checks", action="store_true",
+                        help="List registered checks instead of running them (use with checks action)")
+    parser.add_argument("--profile-output",
+                        help="Write per-check profiling data to this file (use with checks action)")
+    parser.add_argument("--profile-format", choices=["json", "chrome"], default="json",
+                        help="Profile output format, chrome produces a Chrome trace (use with checks action)")
     parser.add_argument("--config", default="scripts/config.json",
                         help="Path to configuration file")
 
@@ -736,6 +2276,10 @@ def main():
         result = runbook.run_load_test()
         sys.exit(0 if result else 1)
 
+    elif args.action == "capacity-test":
+        result = runbook.run_capacity_test()
+        sys.exit(0 if result else 1)
+
     elif args.action == "compare":
         if not args.compare_with:
             print("Error: --compare-with argument is required for compare action")
@@ -754,5 +2298,67 @@ def main():
             print("Failed to generate report")
             sys.exit(1)
 
+    elif args.action == "cost-efficiency":
+        results = [runbook.calculate_cost_efficiency(args.infracost_file, args.load_test_file)]
+        if args.compare_with:
+            other_runbook = InfrastructureRunbook(args.compare_with, args.config)
+            results.append(other_runbook.calculate_cost_efficiency())
+
+        if not all(results):
+            print("Failed to calculate cost efficiency")
+            sys.exit(1)
+
+        def fmt(value, spec):
+            return "N/A" if value is None else format(value, spec)
+
+        rows = [["Monthly cost ($)"] + [fmt(r["monthly_cost"], ".2f") for r in results]]
+        for component in results[0]["component_costs"]:
+            rows.append([f"  {component} ($)"] + [fmt(r["component_costs"][component], ".2f") for r in results])
+        rows += [
+            ["Throughput basis"] + [r["throughput_basis"] for r in results],
+            ["Sustainable RPS"] + [fmt(r["sustainable_rps"], ".2f") for r in results],
+            ["p99 response time (s)"] + [fmt(r["p99_response_time"], ".4f") for r in results],
+            ["Cost per million requests ($)"] + [fmt(r["cost_per_million_requests"], ".4f") for r in results],
+            ["Headroom RPS (vs expected peak)"] + [fmt(r["headroom_rps"], ".2f") for r in results],
+            ["Headroom RPS per dollar"] + [fmt(r["headroom_rps_per_dollar"], ".4f") for r in results],
+        ]
+        print(tabulate.tabulate(rows,
+                                headers=["Metric"] + [r["environment"] for r in results],
+                                tablefmt="grid"))
+
+        report_dir = runbook.config.get("report_output_dir", "runbook_reports")
+        if not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(report_dir, f"{args.environment}_cost_efficiency_{timestamp}.json")
+        with open(output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Cost efficiency results saved: {output_file}")
+        sys.exit(0)
+
+    elif args.action == "replay":
+        if not args.replay_source:
+            print("Error: --replay-source argument is required for replay action")
+            sys.exit(1)
+        result = runbook.replay_traffic(args.replay_source, args.target_url, args.speed)
+        sys.exit(0 if result else 1)
+
+    elif args.action == "coldstart":
+        result = runbook.measure_cold_start(args.mode, args.trials)
+        sys.exit(0 if result else 1)
+
+    elif args.action == "checks":
+        if args.list_checks:
+            runbook.list_checks()
+            sys.exit(0)
+        names = [name.strip() for name in args.checks.split(",") if name.strip()] if args.checks else None
+        result = runbook.run_checks(names, args.profile_output, args.profile_format)
+        sys.exit(0 if result else 1)
+
+    elif args.action == "regress":
+        regressed = runbook.detect_regression(args.regress_action, args.regress_metric,
+                                              True if args.require_baseline else None)
+        sys.exit(1 if regressed else 0)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+ECS service checks for the infrastructure runbook.
+
+Loaded by the `checks` action from the plugins directory. Each plugin module
+provides a register(registry) function that adds its checks.
+"""
+
+
+def check_ecs_services(runbook, results):
+    """ECS services are running their desired number of tasks."""
+    ecs = runbook.get_client('ecs')
+    issues = []
+
+    for cluster_arn in results["resources"].get("ecs_clusters", []):
+        service_arns = []
+        paginator = ecs.get_paginator('list_services')
+        for page in paginator.paginate(cluster=cluster_arn):
+            service_arns.extend(page["serviceArns"])
+
+        # describe_services accepts at most 10 services per call
+        for i in range(0, len(service_arns), 10):
+            response = ecs.describe_services(cluster=cluster_arn, services=service_arns[i:i + 10])
+            for service in response["services"]:
+                if service["runningCount"] < service["desiredCount"]:
+                    issues.append(f"Service {service['serviceName']} in {cluster_arn.split('/')[-1]} is running "
+                                  f"{service['runningCount']} of {service['desiredCount']} desired tasks")
+                if len(service.get("deployments", [])) > 1:
+                    issues.append(f"Service {service['serviceName']} has a deployment in progress")
+
+    return issues
+
+
+def register(registry):
+    registry.register("ecs-services", check_ecs_services,
+                      depends_on=["resources"], aws_services=["ecs"], cost=2)